@@ -34,7 +34,8 @@ echo "4. Select this repository"
 echo "5. Add environment variables:"
 echo "   - BOT_TOKEN=your_discord_bot_token"
 echo "   - OPENAI_API_KEY=your_openai_api_key"
-echo "   - DATABASE_URL=sqlite+aiosqlite:///:memory:"
+echo "   - DATABASE_URL=sqlite+aiosqlite:////data/bot.db"
+echo "   (attach a volume at /data to keep conversation history)"
 echo "6. Deploy!"
 echo ""
 echo "🤖 Your bot will be running 24/7 on Railway!" 
\ No newline at end of file
@@ -0,0 +1,15 @@
+#!/bin/sh
+# Make the data volume writable by the bot user, then drop root privileges.
+# Fly and Docker mount fresh volumes owned by root.
+set -e
+
+DATA_DIR="${DATA_DIR:-/data}"
+
+if [ "$(id -u)" = "0" ]; then
+    mkdir -p "$DATA_DIR"
+    chown bot:bot "$DATA_DIR"
+    export HOME=/home/bot
+    exec setpriv --reuid=bot --regid=bot --init-groups "$@"
+fi
+
+exec "$@"
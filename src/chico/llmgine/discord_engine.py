@@ -1,8 +1,9 @@
 import uuid
 import json
+import time
 import asyncio
-from typing import Any, Optional
-from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
 
 from llmgine.bus.bus import MessageBus
 from llmgine.llm.context.memory import SimpleChatHistory
@@ -37,32 +38,255 @@ class DiscordEngineToolResultEvent(Event):
     """Event emitted when a tool is executed."""
     tool_name: str = ""
     result: Any = None
+    result_tokens: int = 0
+
+
+# USD per million (input, output) tokens, by model class name. Calls to
+# models not listed here are counted but left out of cost_usd.
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "Gpt41": (2.00, 8.00),
+    "Gpt41Mini": (0.40, 1.60),
+    "Gpt41Nano": (0.10, 0.40),
+    "Gpt4o": (2.50, 10.00),
+    "Gpt4oMini": (0.15, 0.60),
+    "O4Mini": (1.10, 4.40),
+}
+
+# Stored as the assistant turn when terminal tool results were sent as the reply
+ELIDED_REPLY_NOTE = "(Sent the tool results above to the user as my reply.)"
+
+# Model class names already warned about for having no price
+_unpriced_models: Set[str] = set()
+
+
+@dataclass
+class PolicyStats:
+    """Latency and cost counters for one ModelPolicy, across every engine using it."""
+    turns: int = 0
+    llm_calls: int = 0
+    simple_model_calls: int = 0
+    elided_llm_calls: int = 0
+    capped_turns: int = 0
+    turn_seconds: float = 0.0
+    llm_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+    unpriced_llm_calls: int = 0
+    # Tool name -> (calls, result tokens added to the prompt)
+    tool_results: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+
+    def record_tool_result(self, tool_name: str, tokens: int):
+        """Add one tool result's token count to the per-tool totals."""
+        calls, total = self.tool_results.get(tool_name, (0, 0))
+        self.tool_results[tool_name] = (calls + 1, total + tokens)
+
+    def summary(self) -> str:
+        """Format the counters for logs or a Discord reply."""
+        avg_turn = self.turn_seconds / self.turns if self.turns else 0.0
+        avg_llm = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+        return (
+            f"turns={self.turns} avg_turn={avg_turn:.2f}s "
+            f"llm_calls={self.llm_calls} avg_llm={avg_llm:.2f}s "
+            f"simple_model_calls={self.simple_model_calls} "
+            f"elided_llm_calls={self.elided_llm_calls} capped_turns={self.capped_turns} "
+            f"tokens={self.prompt_tokens}+{self.completion_tokens} cost=${self.cost_usd:.4f}"
+            + (f" unpriced_llm_calls={self.unpriced_llm_calls}" if self.unpriced_llm_calls else "")
+            + "".join(
+                f"\n{name}: calls={calls} avg_result_tokens={total // calls}"
+                for name, (calls, total) in sorted(self.tool_results.items())
+            )
+        )
+
+
+@dataclass
+class ModelPolicy:
+    """How DiscordEngine picks models and when it can skip calling one.
+
+    Attributes:
+        name: Label for the policy in logs and stats
+        simple_model: Optional cheaper model for short first turns; None uses the default model
+        simple_prompt_max_chars: Prompts up to this length count as simple
+        elide_terminal_tools: Return results of tools marked terminal without another LLM call
+        max_iterations: Most LLM calls allowed in one turn
+        stats: Counters shared by every engine using this policy
+    """
+    name: str = "default"
+    simple_model: Optional[Any] = None
+    simple_prompt_max_chars: int = 80
+    elide_terminal_tools: bool = True
+    max_iterations: int = 5
+    stats: PolicyStats = field(default_factory=PolicyStats)
+
+
+# tiktoken encoding for counting tool result tokens, set by load_token_encoding
+_token_encoding: Any = None
+
+
+def load_token_encoding() -> bool:
+    """Load the tiktoken encoding used by count_tokens. Returns True if loaded.
+
+    Loading reads (and may download) the BPE file, so call it off the event
+    loop, e.g. with asyncio.to_thread during start-up.
+    """
+    global _token_encoding
+    try:
+        import tiktoken
+        _token_encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"tiktoken unavailable, estimating tool result tokens: {e}")
+        return False
+    return True
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens text adds to the prompt.
+
+    Uses tiktoken once load_token_encoding has run and falls back to an
+    estimate of four characters per token otherwise.
+    """
+    if _token_encoding is None:
+        return (len(text) + 3) // 4
+    return len(_token_encoding.encode(text))
+
+
+def drop_unanswered_tool_calls(entries: List[dict]) -> List[dict]:
+    """Remove assistant tool calls that have no result for every call.
+
+    A crash mid-turn can leave an assistant message with tool_calls but
+    without all of its tool results, which OpenAI rejects on replay. The
+    message and any partial results are dropped.
+    """
+    kept: List[dict] = []
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        call_ids = {call.get("id") for call in entry.get("tool_calls") or []}
+        if entry.get("role") != "assistant" or not call_ids:
+            if entry.get("role") != "tool":
+                kept.append(entry)
+            i += 1
+            continue
+        results = []
+        i += 1
+        while i < len(entries) and entries[i].get("role") == "tool":
+            results.append(entries[i])
+            i += 1
+        if call_ids <= {result.get("tool_call_id") for result in results}:
+            kept.append(entry)
+            kept.extend(results)
+    return kept
+
+
+class PersistentChatHistory(SimpleChatHistory):
+    """Chat history that appends every message to a ConversationStore."""
+
+    def __init__(self, engine_id: str, session_id: SessionID, store: Any, turns: int = 20):
+        super().__init__(engine_id=engine_id, session_id=session_id)
+        self.store = store
+        self.turns = turns
+        self._replaying = False
+
+    def store_string(self, string: str, role: str):
+        super().store_string(string, role)
+        self._persist({"role": role, "content": string})
+
+    async def store_assistant_message(self, message_object: Any):
+        await super().store_assistant_message(message_object)
+        self._persist(message_object.model_dump(exclude_none=True))
+
+    def store_tool_call_result(self, tool_call_id: str, name: str, content: str):
+        super().store_tool_call_result(
+            tool_call_id=tool_call_id, name=name, content=content
+        )
+        self._persist(
+            {"role": "tool", "tool_call_id": tool_call_id, "name": name, "content": content}
+        )
+
+    def clear(self):
+        super().clear()
+        self.store.clear(str(self.session_id))
+
+    async def load(self):
+        """Replace the in-memory history with the session's most recent turns."""
+        entries = drop_unanswered_tool_calls(
+            await self.store.load_recent(str(self.session_id), self.turns)
+        )
+        super().clear()
+        self._replaying = True
+        try:
+            for entry in entries:
+                if entry.get("role") == "assistant":
+                    await self.store_assistant_message(
+                        ChatCompletionMessage.model_validate(entry)
+                    )
+                elif entry.get("role") == "tool":
+                    self.store_tool_call_result(
+                        tool_call_id=entry["tool_call_id"],
+                        name=entry["name"],
+                        content=entry["content"],
+                    )
+                else:
+                    self.store_string(entry.get("content") or "", entry["role"])
+        finally:
+            self._replaying = False
+
+    async def sync(self):
+        """Reload the history if another bot process has added to it."""
+        if self.store.shared and await self.store.has_newer_messages(str(self.session_id)):
+            await self.load()
+
+    def _persist(self, message: dict):
+        # Messages replayed from the store are already persisted
+        if not self._replaying:
+            self.store.append(str(self.session_id), message)
 
 
 class DiscordEngine:
+    # Tool schemas per set of registered tools, shared by every engine in the process
+    _tool_schema_cache: Dict[Tuple[str, ...], List[dict]] = {}
+
     def __init__(
         self,
         session_id: SessionID,
         system_prompt: Optional[str] = None,
+        history_store: Optional[Any] = None,
+        history_turns: int = 20,
+        model_policy: Optional[ModelPolicy] = None,
     ):
         """Initialize the Discord LLM engine.
 
         Args:
             session_id: The session identifier
             system_prompt: Optional system prompt to set
+            history_store: Optional ConversationStore to persist the history to
+            history_turns: Number of recent turns to load from the history store
+            model_policy: Optional ModelPolicy; defaults to ModelPolicy()
         """
         self.message_bus: MessageBus = MessageBus()
         self.engine_id: str = str(uuid.uuid4())
         self.session_id: SessionID = SessionID(session_id)
 
         # Create tightly coupled components
-        self.context_manager = SimpleChatHistory(
-            engine_id=self.engine_id, session_id=self.session_id
-        )
+        if history_store is not None:
+            self.context_manager = PersistentChatHistory(
+                engine_id=self.engine_id,
+                session_id=self.session_id,
+                store=history_store,
+                turns=history_turns,
+            )
+        else:
+            self.context_manager = SimpleChatHistory(
+                engine_id=self.engine_id, session_id=self.session_id
+            )
         self.llm_manager = Gpt41Mini(Providers.OPENAI)
+        self.model_policy = model_policy or ModelPolicy()
         self.tool_manager = ToolManager(
             engine_id=self.engine_id, session_id=self.session_id, llm_model_name="openai"
         )
+        self._tool_keys: List[str] = []
+        # Tools whose result is a user-ready reply (see humanitix_tools.terminal)
+        self.terminal_tools: Set[str] = set()
 
         # Set system prompt if provided
         if system_prompt:
@@ -78,26 +302,45 @@ class DiscordEngine:
             CommandResult: The result of the command execution
         """
         try:
+            # Pick up turns another bot process may have handled for this session
+            if isinstance(self.context_manager, PersistentChatHistory):
+                await self.context_manager.sync()
+
+            policy = self.model_policy
+            stats = policy.stats
+            turn_started = time.perf_counter()
+            stats.turns += 1
+
             # 1. Add user message to history
             self.context_manager.store_string(command.prompt, "user")
 
-            # Loop for potential tool execution cycles
-            while True:
+            # Loop for potential tool execution cycles, up to the policy's cap
+            for iteration in range(policy.max_iterations):
                 # 2. Get current context (including latest user message or tool results)
                 current_context = await self.context_manager.retrieve()
 
                 # 3. Get available tools
-                tools = await self.tool_manager.get_tools()
-
-                # 4. Call LLM
+                tools = await self.get_tools()
+
+                # 4. Call LLM, routing short opening prompts to the simple model
+                llm = self.llm_manager
+                if (
+                    iteration == 0
+                    and policy.simple_model is not None
+                    and len(command.prompt) <= policy.simple_prompt_max_chars
+                ):
+                    llm = policy.simple_model
+                    stats.simple_model_calls += 1
                 await self.message_bus.publish(
                     DiscordEngineStatusEvent(
                         status="calling LLM", session_id=self.session_id
                     )
                 )
-                response: OpenAIResponse = await self.llm_manager.generate(
+                llm_started = time.perf_counter()
+                response: OpenAIResponse = await llm.generate(
                     messages=current_context, tools=tools
                 )
+                self._record_llm_call(llm, response, time.perf_counter() - llm_started)
                 assert isinstance(response, OpenAIResponse), (
                     "response is not an OpenAIResponse"
                 )
@@ -115,18 +358,10 @@ class DiscordEngine:
                 if not response_message.tool_calls:
                     # No tool calls, break the loop and return the content
                     final_content = response_message.content or ""
-
-                    # Notify status complete
-                    await self.message_bus.publish(
-                        DiscordEngineStatusEvent(
-                            status="finished", session_id=self.session_id
-                        )
-                    )
-                    return CommandResult(
-                        success=True, result=final_content, session_id=self.session_id
-                    )
+                    return await self._finish_turn(final_content, turn_started)
 
                 # 8. Process tool calls
+                terminal_results: List[str] = []
                 for tool_call in response_message.tool_calls:
                     tool_call_obj = ToolCall(
                         id=tool_call.id,
@@ -157,14 +392,20 @@ class DiscordEngine:
                         )
 
                         # Publish tool execution event
+                        result_tokens = count_tokens(result_str)
+                        stats.record_tool_result(tool_call_obj.name, result_tokens)
                         await self.message_bus.publish(
                             DiscordEngineToolResultEvent(
                                 tool_name=tool_call_obj.name,
                                 result=result_str,
+                                result_tokens=result_tokens,
                                 session_id=self.session_id,
                             )
                         )
 
+                        if tool_call_obj.name in self.terminal_tools:
+                            terminal_results.append(result_str)
+
                     except Exception as e:
                         error_msg = f"Error executing tool {tool_call_obj.name}: {str(e)}"
                         print(error_msg)  # Debug print
@@ -174,9 +415,31 @@ class DiscordEngine:
                             name=tool_call_obj.name,
                             content=error_msg,
                         )
+                # 9. If every tool called was terminal and succeeded, its output
+                # already is the reply, so skip the follow-up LLM call
+                if (
+                    policy.elide_terminal_tools
+                    and len(terminal_results) == len(response_message.tool_calls)
+                ):
+                    final_content = "\n\n".join(terminal_results)
+                    # The results are already in the history as tool messages,
+                    # so only note that they were sent rather than repeat them
+                    self.context_manager.store_string(ELIDED_REPLY_NOTE, "assistant")
+                    stats.elided_llm_calls += 1
+                    return await self._finish_turn(final_content, turn_started)
+
                 # After processing all tool calls, loop back to call the LLM again
                 # with the updated context (including tool results).
 
+            # Iteration cap reached without a final answer
+            stats.capped_turns += 1
+            final_content = (
+                "Sorry, I couldn't finish working that out. "
+                "Could you try asking in a simpler way?"
+            )
+            self.context_manager.store_string(final_content, "assistant")
+            return await self._finish_turn(final_content, turn_started)
+
         except Exception as e:
             print(f"ERROR in handle_command: {e}")  # Simple print for now
             import traceback
@@ -184,15 +447,84 @@ class DiscordEngine:
 
             return CommandResult(success=False, error=str(e), session_id=self.session_id)
 
+    async def _finish_turn(self, final_content: str, turn_started: float) -> CommandResult:
+        """Record turn latency, notify completion and build the result."""
+        self.model_policy.stats.turn_seconds += time.perf_counter() - turn_started
+
+        # Notify status complete
+        await self.message_bus.publish(
+            DiscordEngineStatusEvent(
+                status="finished", session_id=self.session_id
+            )
+        )
+        return CommandResult(
+            success=True, result=final_content, session_id=self.session_id
+        )
+
+    def _record_llm_call(self, llm: Any, response: Any, seconds: float):
+        """Add one LLM call's latency, token usage and estimated cost to the stats."""
+        stats = self.model_policy.stats
+        stats.llm_calls += 1
+        stats.llm_seconds += seconds
+        usage = getattr(response.raw, "usage", None)
+        if usage is None:
+            return
+        prompt_tokens = usage.prompt_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        model_name = type(llm).__name__
+        if model_name not in MODEL_PRICES:
+            stats.unpriced_llm_calls += 1
+            if model_name not in _unpriced_models:
+                _unpriced_models.add(model_name)
+                print(f"⚠️ No price for model {model_name}; its calls are left out of cost_usd")
+            return
+        input_price, output_price = MODEL_PRICES[model_name]
+        stats.cost_usd += (
+            prompt_tokens * input_price + completion_tokens * output_price
+        ) / 1_000_000
+
     async def register_tool(self, function: AsyncOrSyncToolFunction):
         """Register a function as a tool.
 
+        Functions marked terminal (see humanitix_tools.terminal) can have their
+        result returned as the reply without another LLM call.
+
         Args:
             function: The function to register as a tool
         """
         await self.tool_manager.register_tool(function)
+        self._tool_keys.append(f"{function.__module__}.{function.__qualname__}")
+        if getattr(function, "terminal", False):
+            self.terminal_tools.add(function.__name__)
         print(f"Tool registered: {function.__name__}")
 
+    async def register_tools(self, functions: List[AsyncOrSyncToolFunction]):
+        """Register several functions as tools, in order.
+
+        Args:
+            functions: The functions to register as tools
+        """
+        for function in functions:
+            await self.register_tool(function)
+
+    async def get_tools(self) -> List[dict]:
+        """Get the tool schemas for the LLM.
+
+        Schemas are built once per process for each set of registered tools,
+        so new engines and later turns reuse them instead of re-parsing.
+        """
+        key = tuple(self._tool_keys)
+        if key not in DiscordEngine._tool_schema_cache:
+            DiscordEngine._tool_schema_cache[key] = await self.tool_manager.get_tools()
+        return DiscordEngine._tool_schema_cache[key]
+
+    async def load_history(self):
+        """Load the most recent turns from the history store, if one is set."""
+        if isinstance(self.context_manager, PersistentChatHistory):
+            await self.context_manager.load()
+
     async def clear_context(self):
         """Clear the conversation context."""
         self.context_manager.clear()
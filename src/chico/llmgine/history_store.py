@@ -0,0 +1,195 @@
+"""
+Persistent conversation store.
+Messages are appended to a single SQLite table indexed by session_id. Writes
+are queued and flushed in batches by a background task so handling a message
+never waits on disk, and sessions are rehydrated from their most recent turns.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import aiosqlite
+
+# Role of the marker row appended when a session is cleared
+CLEAR_MARKER = "clear"
+
+
+def sqlite_path_from_url(url: str) -> str:
+    """Turn a sqlite:/// or sqlite+aiosqlite:/// URL into a file path."""
+    for prefix in ("sqlite+aiosqlite:///", "sqlite:///"):
+        if url.startswith(prefix):
+            return url[len(prefix):]
+    raise ValueError(f"Unsupported database URL: {url}")
+
+
+class ConversationStore:
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.5,
+        max_batch: int = 200,
+        shared: bool = False,
+    ):
+        """Initialize the store. Call open() before use.
+
+        Args:
+            path: SQLite file path, or ":memory:"
+            flush_interval: Longest time a queued message waits before being written
+            max_batch: Most messages written in a single transaction
+            shared: True if other bot processes write to the same file
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.shared = shared
+        self._db: Optional[aiosqlite.Connection] = None
+        self._pending: List[Tuple[str, str, str, float]] = []
+        self._wakeup = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        # Highest message id loaded for each session, and the ids this
+        # process has written to it since
+        self._last_ids: Dict[str, int] = {}
+        self._own_ids: Dict[str, Set[int]] = {}
+
+    async def open(self):
+        """Connect, create the schema and start the write-behind task."""
+        directory = os.path.dirname(self.path)
+        if self.path != ":memory:" and directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = await aiosqlite.connect(self.path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_session
+                ON messages (session_id, id);
+            CREATE INDEX IF NOT EXISTS idx_messages_session_role
+                ON messages (session_id, role, id);
+            """
+        )
+        await self._db.commit()
+        self._writer = asyncio.create_task(self._write_behind())
+
+    def append(self, session_id: str, message: dict):
+        """Queue a message for writing. Never blocks."""
+        self._pending.append(
+            (session_id, message.get("role", ""), json.dumps(message), time.time())
+        )
+        self._wakeup.set()
+
+    def clear(self, session_id: str):
+        """Hide a session's earlier messages by appending a clear marker."""
+        self._pending.append((session_id, CLEAR_MARKER, "{}", time.time()))
+        self._wakeup.set()
+
+    async def load_recent(self, session_id: str, turns: int) -> List[dict]:
+        """Load the messages of a session's last `turns` user turns.
+
+        Only rows after the latest clear marker are considered, and a turn
+        starts at a user message so tool calls are never split from their
+        results.
+        """
+        await self.flush()
+        cleared_after = await self._scalar(
+            "SELECT COALESCE(MAX(id), 0) FROM messages WHERE session_id = ? AND role = ?",
+            (session_id, CLEAR_MARKER),
+        )
+        first_id = await self._scalar(
+            "SELECT id FROM messages WHERE session_id = ? AND role = 'user' AND id > ? "
+            "ORDER BY id DESC LIMIT 1 OFFSET ?",
+            (session_id, cleared_after, max(turns, 1) - 1),
+        )
+        if first_id is None:
+            # Fewer than `turns` turns stored, so take everything after the marker
+            first_id = cleared_after + 1
+        async with self._db.execute(
+            "SELECT id, message FROM messages WHERE session_id = ? AND id >= ? "
+            "AND role != ? ORDER BY id",
+            (session_id, first_id, CLEAR_MARKER),
+        ) as cursor:
+            rows = await cursor.fetchall()
+        self._last_ids[session_id] = max(
+            [cleared_after] + [row[0] for row in rows]
+        )
+        self._own_ids.pop(session_id, None)
+        return [json.loads(row[1]) for row in rows]
+
+    async def has_newer_messages(self, session_id: str) -> bool:
+        """True if another process has written to the session since we last saw it."""
+        newer = await self._scalar(
+            "SELECT COUNT(*) FROM messages WHERE session_id = ? AND id > ?",
+            (session_id, self._last_ids.get(session_id, 0)),
+        )
+        return newer > len(self._own_ids.get(session_id, ()))
+
+    async def flush(self):
+        """Write every queued message now."""
+        async with self._write_lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                try:
+                    await self._write_batch(batch)
+                except Exception:
+                    # Keep the batch queued so the next flush retries it
+                    self._pending[:0] = batch
+                    raise
+
+    async def close(self):
+        """Stop the writer, flush what is queued and close the connection."""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        if self._db is not None:
+            await self.flush()
+            await self._db.close()
+            self._db = None
+
+    async def _write_behind(self):
+        while True:
+            await self._wakeup.wait()
+            # Let a burst of messages from the same turn accumulate
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error writing conversation history: {e}")
+
+    async def _write_batch(self, batch: List[Tuple[str, str, str, float]]):
+        inserted: List[Tuple[str, int]] = []
+        try:
+            for row in batch:
+                cursor = await self._db.execute(
+                    "INSERT INTO messages (session_id, role, message, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    row,
+                )
+                inserted.append((row[0], cursor.lastrowid))
+            await self._db.commit()
+        except Exception:
+            await self._db.rollback()
+            raise
+        # Our own writes shouldn't make the session look changed elsewhere
+        for session_id, row_id in inserted:
+            self._own_ids.setdefault(session_id, set()).add(row_id)
+
+    async def _scalar(self, sql: str, params: tuple):
+        async with self._db.execute(sql, params) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else None
@@ -4,25 +4,54 @@ These are wrapper functions that expose the existing Humanitix functionality
 as tools that can be called by the LLM.
 """
 
-from typing import List, Dict, Any
+import asyncio
+from typing import List, Dict, Any, Optional
+
 from chico.tools.humanitix import Humanitix
 
 
-# Initialize the Humanitix client
-humanitix_client = Humanitix()
+# The Humanitix client is created on first use rather than at import time
+_humanitix_client: Optional[Humanitix] = None
+
+
+def get_client() -> Humanitix:
+    """Return the shared Humanitix client, creating it on first use."""
+    global _humanitix_client
+    if _humanitix_client is None:
+        _humanitix_client = Humanitix()
+    return _humanitix_client
+
+
+def terminal(function):
+    """Mark a tool whose result is already a user-ready reply.
+    
+    When every tool the LLM calls in a step is terminal, DiscordEngine returns
+    their results directly instead of asking the LLM to restate them. Terminal
+    tools must therefore raise on failure rather than return an error message,
+    so the engine records the error and lets the LLM respond to it.
+    """
+    function.terminal = True
+    return function
+
+
+# Every tool runs the Humanitix client through asyncio.to_thread: it blocks on
+# HTTP requests and on the shared SQLite cache, which can wait on other processes
 
 
-def list_events() -> str:
+async def list_events() -> str:
     """List all available events from Humanitix.
     
     Returns:
         A formatted string containing all events with their details.
     """
-    return humanitix_client.list_events()
+    return await asyncio.to_thread(get_client().list_events)
 
 
-def get_event_details(event_name: str) -> str:
-    """Get detailed information about a specific event by name.
+async def get_event_details(event_name: str) -> str:
+    """Get the key details of a specific event by name: id, venue, dates and link.
+    
+    The description is left out; call get_event_description if the user
+    asks what the event is about.
     
     Args:
         event_name: The name of the event to get details for.
@@ -30,10 +59,25 @@ def get_event_details(event_name: str) -> str:
     Returns:
         A formatted string containing the event details.
     """
-    return humanitix_client.show_event_details_by_name(event_name)
+    return await asyncio.to_thread(
+        get_client().show_event_details_by_name, event_name, include_description=False
+    )
 
 
-def get_ticket_status(event_name: str) -> str:
+async def get_event_description(event_name: str) -> str:
+    """Get the full description of a specific event by name.
+    
+    Args:
+        event_name: The name of the event to describe.
+        
+    Returns:
+        The event's full description.
+    """
+    return await asyncio.to_thread(get_client().show_event_description_by_name, event_name)
+
+
+@terminal
+async def get_ticket_status(event_name: str) -> str:
     """Get ticket status and availability for a specific event.
     
     Args:
@@ -42,10 +86,40 @@ def get_ticket_status(event_name: str) -> str:
     Returns:
         A formatted string containing ticket status and availability information.
     """
-    return humanitix_client.get_ticket_status(event_name)
+    client = get_client()
+    if not client.validate_api_key():
+        raise RuntimeError("HUMANITIX_API_KEY not set in .env file.")
+    return await asyncio.to_thread(client.ticket_status, event_name)
 
 
-def search_events(query: str) -> str:
+@terminal
+async def get_ticket_dashboard(name_filter: str = "", start_date: str = "", end_date: str = "") -> str:
+    """Get ticket sales for many events at once as one table.
+    
+    Use this instead of calling get_ticket_status repeatedly when asked about
+    ticket sales across several events (e.g. "this month"). Without dates only
+    upcoming events are included, and at most 20 events are shown.
+    
+    Args:
+        name_filter: Optional text that event names must contain.
+        start_date: Optional earliest event date, in YYYY-MM-DD format; set it to include past events.
+        end_date: Optional latest event date, in YYYY-MM-DD format.
+        
+    Returns:
+        A table of capacity, sold, remaining and sell-through rate per event.
+    """
+    client = get_client()
+    if not client.validate_api_key():
+        raise RuntimeError("HUMANITIX_API_KEY not set in .env file.")
+    return await asyncio.to_thread(
+        client.ticket_dashboard,
+        name_filter=name_filter or None,
+        start_date=start_date or None,
+        end_date=end_date or None,
+    )
+
+
+async def search_events(query: str) -> str:
     """Search for events that match the given query.
     
     Args:
@@ -56,7 +130,7 @@ def search_events(query: str) -> str:
     """
     # This would need to be implemented in the Humanitix class
     # For now, we'll use the existing list_events and filter
-    all_events = humanitix_client.list_events()
+    all_events = await asyncio.to_thread(get_client().list_events)
     # Simple text-based search - could be enhanced
     if query.lower() in all_events.lower():
         return f"Found events matching '{query}':\n{all_events}"
@@ -64,7 +138,7 @@ def search_events(query: str) -> str:
         return f"No events found matching '{query}'"
 
 
-def get_upcoming_events() -> str:
+async def get_upcoming_events() -> str:
     """Get a list of upcoming events.
     
     Returns:
@@ -72,4 +146,16 @@ def get_upcoming_events() -> str:
     """
     # This would need to be implemented in the Humanitix class
     # For now, return all events
-    return humanitix_client.list_events() 
\ No newline at end of file
+    return await asyncio.to_thread(get_client().list_events) 
+
+
+# Tools registered with every engine, in registration order
+HUMANITIX_TOOLS = [
+    list_events,
+    get_event_details,
+    get_event_description,
+    get_ticket_status,
+    get_ticket_dashboard,
+    search_events,
+    get_upcoming_events,
+]
@@ -1,36 +1,107 @@
 """
 Enhanced Discord bot with LLMgine integration.
 This bot uses LLMgine to process natural language and automatically call appropriate tools.
+
+Heavy imports (llmgine, openai, the tool modules) are deferred to a warm-up task
+that runs while the bot connects to Discord, so startup is bounded by the
+Discord handshake rather than by imports.
 """
 
+import time
+
+# Measure startup phases from before the first heavy import
+_process_started = time.perf_counter()
+
 import discord
 from discord.ext import commands
 import os
+import importlib
 from dotenv import load_dotenv
 import asyncio
-from typing import Dict, Optional
-
-from chico.llmgine.discord_engine import DiscordEngine, DiscordEngineCommand
-from chico.llmgine.humanitix_tools import (
-    list_events,
-    get_event_details,
-    get_ticket_status,
-    search_events,
-    get_upcoming_events
-)
-from llmgine.llm import SessionID
-from llmgine.bootstrap import ApplicationBootstrap, ApplicationConfig
+from typing import TYPE_CHECKING, Dict, Optional
+
+from chico.tools.discord_send_queue import DiscordSendQueue
+from chico.tools.shared_state import SharedStateStore
+from chico.tools.ticket_watch import TicketWatcher
+
+if TYPE_CHECKING:
+    from chico.llmgine.discord_engine import DiscordEngine, ModelPolicy
+    from chico.llmgine.history_store import ConversationStore
 
 # Load environment variables
 load_dotenv()
 token = os.getenv("BOT_TOKEN")
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+# Sharded mode: several processes each run a subset of the Discord shards,
+# e.g. BOT_SHARD_COUNT=4 with BOT_SHARD_IDS=0,1 in one process and 2,3 in another
+shard_count = int(os.getenv("BOT_SHARD_COUNT", "0"))
+shard_ids = [int(i) for i in os.getenv("BOT_SHARD_IDS", "").split(",") if i.strip()]
+
+# Shared store for the event catalogue, ticket counts and leader leases across processes
+shared_state_path = os.getenv("SHARED_STATE_PATH")
+shared_store: Optional[SharedStateStore] = (
+    SharedStateStore(shared_state_path) if shared_state_path else None
+)
+if shared_store is None and shard_count:
+    print("⚠️ Sharded mode without SHARED_STATE_PATH: each process keeps its own cache")
+
+# Seconds between catalogue refreshes by the elected refresher process
+CATALOGUE_REFRESH_INTERVAL = float(os.getenv("CATALOGUE_REFRESH_INTERVAL", "120"))
+
+# Conversation histories are persisted to DATABASE_URL (a SQLite file) and the
+# last HISTORY_TURNS turns are reloaded when a user's engine is recreated
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///data/bot.db")
+HISTORY_TURNS = int(os.getenv("HISTORY_TURNS", "20"))
+history_store: Optional["ConversationStore"] = None
+
+# Model policy: skip the follow-up LLM call after terminal tools, optionally
+# route short prompts to a cheaper model (a class name from
+# llmgine.llm.models.openai_models) and cap LLM calls per turn
+LLM_ELIDE_TERMINAL_TOOLS = os.getenv("LLM_ELIDE_TERMINAL_TOOLS", "1") == "1"
+LLM_SIMPLE_MODEL = os.getenv("LLM_SIMPLE_MODEL")
+LLM_MAX_ITERATIONS = int(os.getenv("LLM_MAX_ITERATIONS", "5"))
+model_policy: Optional["ModelPolicy"] = None
+
+# Ticket watcher: keeps ticket status for upcoming events warm and, if a
+# channel is set, announces events passing the sell-through thresholds
+TICKET_WATCH = os.getenv("TICKET_WATCH", "1") == "1"
+TICKET_ALERT_CHANNEL_ID = os.getenv("TICKET_ALERT_CHANNEL_ID")
+TICKET_ALERT_THRESHOLDS = [
+    float(t) for t in os.getenv("TICKET_ALERT_THRESHOLDS", "0.8,0.95,1.0").split(",") if t.strip()
+]
+TICKET_WATCH_TICK = float(os.getenv("TICKET_WATCH_TICK", "30"))
+# Alerts already sent, kept on the persistent volume when there is no shared store
+TICKET_ALERTS_PATH = os.getenv("TICKET_ALERTS_PATH", "data/ticket_alerts.json")
+
+# Warm start: restore the last event catalogue from disk before connecting.
+# Keep the snapshot on the same persistent volume as the history database.
+WARM_START = os.getenv("BOT_WARM_START", "1") == "1"
+SNAPSHOT_PATH = os.getenv("HUMANITIX_SNAPSHOT_PATH", "data/humanitix_snapshot.json")
+
+# Startup phase durations in seconds, reported once the bot can answer
+startup_timings: Dict[str, float] = {"discord_import": time.perf_counter() - _process_started}
+startup_reported = False
+
+# Completes once the LLM stack is imported, bootstrapped and tool schemas are built
+engine_ready: Optional[asyncio.Task] = None
+
 # Create bot
-bot = commands.Bot(command_prefix='!', intents=discord.Intents.default())
+if shard_count:
+    bot = commands.AutoShardedBot(
+        command_prefix='!',
+        intents=discord.Intents.default(),
+        shard_count=shard_count,
+        shard_ids=shard_ids or None,
+    )
+else:
+    bot = commands.Bot(command_prefix='!', intents=discord.Intents.default())
+
+# Outbound messages go through per-channel queues that split, coalesce and pace them
+send_queue = DiscordSendQueue()
 
 # Store engine instances per user for session management
-user_engines: Dict[str, DiscordEngine] = {}
+user_engines: Dict[str, "DiscordEngine"] = {}
 
 # System prompt for the LLM
 SYSTEM_PROMPT = """You are a helpful assistant for WIT Unimelb (Women in Technology at University of Melbourne). 
@@ -38,18 +109,45 @@ You help users find information about events, check ticket availability, and pro
 
 You have access to the following tools:
 - list_events: Lists all available events
-- get_event_details: Gets detailed information about a specific event
+- get_event_details: Gets the venue, dates and link for a specific event
+- get_event_description: Gets the full description of a specific event, only when the user asks what it is about
 - get_ticket_status: Checks ticket availability for an event
+- get_ticket_dashboard: Shows ticket sales for many events at once, optionally filtered by name or date range
 - search_events: Searches for events matching a query
 - get_upcoming_events: Shows upcoming events
 
 When users ask about events, tickets, or activities, use the appropriate tools to provide accurate information.
+For ticket sales across several events, call get_ticket_dashboard once rather than get_ticket_status per event.
 Be friendly and helpful, and always provide relevant information about WIT Unimelb events.
 
 If a user asks about something not related to events or WIT Unimelb, politely redirect them to ask about events or activities."""
 
 
-async def get_or_create_engine(user_id: str) -> DiscordEngine:
+async def create_engine(session_id: str) -> "DiscordEngine":
+    """Create an engine with the system prompt and all Humanitix tools registered.
+
+    Args:
+        session_id: The session identifier for the engine
+
+    Returns:
+        DiscordEngine: The new engine instance
+    """
+    from chico.llmgine.discord_engine import DiscordEngine
+    from chico.llmgine.humanitix_tools import HUMANITIX_TOOLS
+    from llmgine.llm import SessionID
+
+    engine = DiscordEngine(
+        session_id=SessionID(session_id),
+        system_prompt=SYSTEM_PROMPT,
+        history_store=history_store,
+        history_turns=HISTORY_TURNS,
+        model_policy=model_policy
+    )
+    await engine.register_tools(HUMANITIX_TOOLS)
+    return engine
+
+
+async def get_or_create_engine(user_id: str) -> "DiscordEngine":
     """Get or create an LLMgine engine for a user.
     
     Args:
@@ -58,31 +156,184 @@ async def get_or_create_engine(user_id: str) -> DiscordEngine:
     Returns:
         DiscordEngine: The engine instance for the user
     """
+    # Wait for the warm-up task if the first message beats it
+    await engine_ready
+
     if user_id not in user_engines:
         # Create new engine for user
-        engine = DiscordEngine(
-            session_id=SessionID(f"discord_{user_id}"),
-            system_prompt=SYSTEM_PROMPT
-        )
-        
-        # Register all tools
-        await engine.register_tool(list_events)
-        await engine.register_tool(get_event_details)
-        await engine.register_tool(get_ticket_status)
-        await engine.register_tool(search_events)
-        await engine.register_tool(get_upcoming_events)
-        
+        engine = await create_engine(f"discord_{user_id}")
+        await engine.load_history()
         user_engines[user_id] = engine
         print(f"Created new engine for user {user_id}")
     
     return user_engines[user_id]
 
 
+def build_model_policy() -> "ModelPolicy":
+    """Build the model policy from the LLM_* environment variables."""
+    from chico.llmgine.discord_engine import ModelPolicy
+
+    simple_model = None
+    if LLM_SIMPLE_MODEL:
+        from llmgine.llm.models import openai_models
+        from llmgine.llm.providers.providers import Providers
+        simple_model = getattr(openai_models, LLM_SIMPLE_MODEL)(Providers.OPENAI)
+
+    return ModelPolicy(
+        name=f"simple={LLM_SIMPLE_MODEL or 'off'},elide={LLM_ELIDE_TERMINAL_TOOLS}",
+        simple_model=simple_model,
+        elide_terminal_tools=LLM_ELIDE_TERMINAL_TOOLS,
+        max_iterations=LLM_MAX_ITERATIONS,
+    )
+
+
+def report_startup_timings():
+    """Print startup phase timings once both Discord and the engine are ready."""
+    global startup_reported
+    if startup_reported or not bot.is_ready() or not engine_ready.done():
+        return
+    startup_reported = True
+    phases = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in startup_timings.items())
+    print(f"⏱️ Startup phases: {phases}")
+
+
+async def refresh_events_in_background():
+    """Refresh the event catalogue without blocking startup."""
+    from chico.llmgine.humanitix_tools import get_client
+
+    try:
+        await asyncio.to_thread(get_client().refresh_events)
+    except Exception as e:
+        print(f"Error refreshing event catalogue: {e}")
+
+
+async def warm_up():
+    """Import the LLM stack, bootstrap LLMgine and prebuild tool schemas.
+
+    Runs alongside the Discord login so the first message after on_ready
+    doesn't pay for any of it.
+    """
+    global history_store, model_policy
+    started = time.perf_counter()
+    await asyncio.to_thread(importlib.import_module, "chico.llmgine.discord_engine")
+    from llmgine.bootstrap import ApplicationBootstrap, ApplicationConfig
+    startup_timings["engine_import"] = time.perf_counter() - started
+
+    # Load the tokenizer used to size tool results off the event loop
+    started = time.perf_counter()
+    from chico.llmgine.discord_engine import load_token_encoding
+    await asyncio.to_thread(load_token_encoding)
+    startup_timings["token_encoding"] = time.perf_counter() - started
+
+    # Open the conversation store before any engine is created
+    started = time.perf_counter()
+    from chico.llmgine.history_store import ConversationStore, sqlite_path_from_url
+    # Only processes running a subset of the shards share the file with others
+    history_store = ConversationStore(
+        sqlite_path_from_url(DATABASE_URL), shared=bool(shard_ids)
+    )
+    await history_store.open()
+    startup_timings["history_store"] = time.perf_counter() - started
+
+    # Initialize LLMgine bootstrap
+    started = time.perf_counter()
+    config = ApplicationConfig(
+        enable_console_handler=False,
+        enable_file_handler=False
+    )
+    bootstrap = ApplicationBootstrap(config)
+    await bootstrap.bootstrap()
+    startup_timings["bootstrap"] = time.perf_counter() - started
+
+    # Build tool schemas once; every user engine reuses them
+    started = time.perf_counter()
+    model_policy = build_model_policy()
+    engine = await create_engine("warmup")
+    await engine.get_tools()
+    startup_timings["tool_schemas"] = time.perf_counter() - started
+
+    # With a shared store the elected refresher keeps the catalogue fresh
+    if shared_store is None:
+        asyncio.create_task(refresh_events_in_background())
+
+    report_startup_timings()
+
+
+async def refresh_catalogue_loop():
+    """Keep the shared event catalogue fresh from whichever process holds the lease.
+
+    Only the lease holder calls the Humanitix API, so the number of catalogue
+    fetches stays the same no matter how many bot processes are running.
+    """
+    while True:
+        try:
+            # SQLite may wait on another process's lock, so stay off the loop
+            if await asyncio.to_thread(
+                shared_store.try_acquire_lease,
+                "humanitix_refresh",
+                CATALOGUE_REFRESH_INTERVAL * 3,
+            ):
+                from chico.llmgine.humanitix_tools import get_client
+
+                await asyncio.to_thread(get_client().refresh_events)
+        except Exception as e:
+            print(f"Error refreshing event catalogue: {e}")
+        await asyncio.sleep(CATALOGUE_REFRESH_INTERVAL)
+
+
+async def announce_ticket_alert(message: str):
+    """Post a ticket alert to the configured announcement channel."""
+    channel = bot.get_channel(int(TICKET_ALERT_CHANNEL_ID))
+    if channel is None:
+        channel = await bot.fetch_channel(int(TICKET_ALERT_CHANNEL_ID))
+    await send_queue.send(channel, message)
+
+
+def start_ticket_watcher() -> asyncio.Task:
+    """Start the background ticket watcher.
+
+    With a shared store only the holder of the ticket_watch lease polls, so
+    sharded processes don't multiply the order fetches or the announcements.
+    """
+    from chico.llmgine.humanitix_tools import get_client
+
+    watcher = TicketWatcher(
+        get_client(),
+        announce=announce_ticket_alert if TICKET_ALERT_CHANNEL_ID else None,
+        thresholds=TICKET_ALERT_THRESHOLDS,
+        state=shared_store,
+        alerts_path=TICKET_ALERTS_PATH,
+    )
+    should_poll = None
+    if shared_store is not None:
+        should_poll = lambda: shared_store.try_acquire_lease(
+            "ticket_watch", ttl=TICKET_WATCH_TICK * 4
+        )
+    return asyncio.create_task(watcher.run(tick=TICKET_WATCH_TICK, should_poll=should_poll))
+
+
+catalogue_refresh_task: Optional[asyncio.Task] = None
+ticket_watch_task: Optional[asyncio.Task] = None
+
+
 @bot.event
 async def on_ready():
+    global catalogue_refresh_task, ticket_watch_task
     print(f'✅ LLMgine Discord Bot is online: {bot.user}')
+    if shard_count:
+        print(f'🧩 Running shards {shard_ids or "all"} of {shard_count}')
     print(f'🤖 Bot is ready to process natural language queries!')
 
+    if "discord_ready" not in startup_timings:
+        startup_timings["discord_ready"] = time.perf_counter() - _process_started
+    report_startup_timings()
+
+    # on_ready fires again after reconnects, so only start the refresher once
+    if shared_store is not None and catalogue_refresh_task is None:
+        catalogue_refresh_task = asyncio.create_task(refresh_catalogue_loop())
+    if TICKET_WATCH and ticket_watch_task is None:
+        ticket_watch_task = start_ticket_watcher()
+
 
 @bot.event
 async def on_message(message):
@@ -105,7 +356,11 @@ async def on_message(message):
         
         # Skip if no content after removing mention/prefix
         if not content:
-            await message.reply("👋 Hi! I can help you with WIT Unimelb events. Try asking me about events, tickets, or upcoming activities!")
+            await send_queue.send(
+                message.channel,
+                "👋 Hi! I can help you with WIT Unimelb events. Try asking me about events, tickets, or upcoming activities!",
+                reference=message,
+            )
             return
         
         # Show typing indicator
@@ -113,6 +368,8 @@ async def on_message(message):
             try:
                 # Get or create engine for this user
                 engine = await get_or_create_engine(str(message.author.id))
+                # Imported here since the engine module loads during warm-up
+                from chico.llmgine.discord_engine import DiscordEngineCommand
                 
                 # Create command for LLMgine
                 command = DiscordEngineCommand(
@@ -125,25 +382,22 @@ async def on_message(message):
                 result = await engine.handle_command(command)
                 
                 if result.success:
-                    # Send the response
-                    response = result.result
-                    # Split long responses if needed
-                    if len(response) > 2000:
-                        # Split into chunks
-                        chunks = [response[i:i+1900] for i in range(0, len(response), 1900)]
-                        for i, chunk in enumerate(chunks):
-                            if i == 0:
-                                await message.reply(chunk)
-                            else:
-                                await message.channel.send(chunk)
-                    else:
-                        await message.reply(response)
+                    # Send the response, replying with the first chunk
+                    await send_queue.send(message.channel, result.result, reference=message)
                 else:
-                    await message.reply(f"❌ Sorry, I encountered an error: {result.error}")
+                    await send_queue.send(
+                        message.channel,
+                        f"❌ Sorry, I encountered an error: {result.error}",
+                        reference=message,
+                    )
                     
             except Exception as e:
                 print(f"Error processing message: {e}")
-                await message.reply("❌ Sorry, I encountered an error processing your request. Please try again!")
+                await send_queue.send(
+                    message.channel,
+                    "❌ Sorry, I encountered an error processing your request. Please try again!",
+                    reference=message,
+                )
     
     # Process commands (needed for Discord.py)
     await bot.process_commands(message)
@@ -156,10 +410,27 @@ async def clear_context(ctx):
     if user_id in user_engines:
         await user_engines[user_id].clear_context()
         await ctx.reply("🧹 Conversation context cleared!")
+    elif history_store is not None:
+        # No engine in this process, but the history may be persisted
+        history_store.clear(f"discord_{user_id}")
+        await ctx.reply("🧹 Conversation context cleared!")
     else:
         await ctx.reply("No conversation context to clear.")
 
 
+@bot.command(name='llmstats')
+@commands.has_permissions(manage_guild=True)
+async def llm_stats(ctx):
+    """Show LLM latency and cost counters for the model policy, plus send stats."""
+    if model_policy is None:
+        await ctx.reply("The LLM engine hasn't started yet.")
+        return
+    await ctx.reply(
+        f"📊 `{model_policy.name}`\n```\n{model_policy.stats.summary()}\n```"
+        f"📨 Discord sends\n```\n{send_queue.stats.summary()}\n```"
+    )
+
+
 @bot.command(name='withelp')
 async def help_command(ctx):
     """Show help information."""
@@ -190,16 +461,30 @@ Just mention me and ask naturally! 🎉"""
 
 async def main():
     """Initialize and run the bot."""
-    # Initialize LLMgine bootstrap
-    config = ApplicationConfig(
-        enable_console_handler=False,
-        enable_file_handler=False
-    )
-    bootstrap = ApplicationBootstrap(config)
-    await bootstrap.bootstrap()
+    global engine_ready
+    from chico.llmgine.humanitix_tools import get_client
+
+    client = get_client()
+    if shared_store is not None:
+        client.cache = shared_store
+
+    if WARM_START:
+        started = time.perf_counter()
+        client.snapshot_path = SNAPSHOT_PATH
+        if client.load_snapshot(SNAPSHOT_PATH):
+            print("📦 Restored event catalogue from snapshot")
+        startup_timings["snapshot_restore"] = time.perf_counter() - started
+
+    # Warm the engine up while the bot logs in
+    engine_ready = asyncio.create_task(warm_up())
     
     # Start the bot
-    await bot.start(token)
+    try:
+        await bot.start(token)
+    finally:
+        # Write out any queued conversation history before exiting
+        if history_store is not None:
+            await history_store.close()
 
 
 if __name__ == "__main__":
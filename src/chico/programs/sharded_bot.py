@@ -0,0 +1,77 @@
+"""
+Launcher for running the LLMgine Discord bot in sharded mode.
+Starts BOT_PROCESSES copies of llmgine_discord_bot.py on this machine, each
+owning a slice of the BOT_SHARD_COUNT Discord shards, all sharing one
+SHARED_STATE_PATH and DATABASE_URL. If any process exits, the rest are
+stopped so the platform restarts the whole group.
+
+Every process must run on the same machine (or VM): the shared stores are
+local SQLite files.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llmgine_discord_bot.py")
+
+
+def shard_slices(processes: int, shard_count: int):
+    """Split shard ids round-robin across processes, e.g. 2 of 4 -> [0, 2], [1, 3]."""
+    return [list(range(i, shard_count, processes)) for i in range(processes)]
+
+
+def main():
+    processes = int(os.getenv("BOT_PROCESSES", "2"))
+    shard_count = int(os.getenv("BOT_SHARD_COUNT", str(processes)))
+    if shard_count < processes:
+        sys.exit("BOT_SHARD_COUNT must be at least BOT_PROCESSES")
+    shared_state_path = os.getenv("SHARED_STATE_PATH", "data/shared_state.db")
+
+    children = []
+    for shard_ids in shard_slices(processes, shard_count):
+        env = dict(
+            os.environ,
+            BOT_SHARD_COUNT=str(shard_count),
+            BOT_SHARD_IDS=",".join(str(i) for i in shard_ids),
+            SHARED_STATE_PATH=shared_state_path,
+        )
+        children.append(subprocess.Popen([sys.executable, BOT_SCRIPT], env=env))
+        print(f"🧩 Started shards {shard_ids} of {shard_count} (pid {children[-1].pid})")
+
+    stopping = []
+
+    def stop(signum=None, frame=None):
+        if signum is not None:
+            stopping.append(signum)
+        for child in children:
+            if child.poll() is None:
+                child.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    exit_code = 0
+    try:
+        while all(child.poll() is None for child in children):
+            time.sleep(1)
+        exit_code = next(child.returncode for child in children if child.poll() is not None)
+    finally:
+        stop()
+        for child in children:
+            try:
+                child.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                child.kill()
+    sys.exit(0 if stopping else exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,7 @@ import os
 from dotenv import load_dotenv
 
 from chico.llmgine.discord_engine import DiscordEngine, DiscordEngineCommand
-from chico.llmgine.humanitix_tools import (
-    list_events,
-    get_event_details,
-    get_ticket_status,
-    search_events,
-    get_upcoming_events
-)
+from chico.llmgine.humanitix_tools import HUMANITIX_TOOLS
 from llmgine.llm import SessionID
 from llmgine.bootstrap import ApplicationBootstrap, ApplicationConfig
 
@@ -27,12 +21,15 @@ You help users find information about events, check ticket availability, and pro
 
 You have access to the following tools:
 - list_events: Lists all available events
-- get_event_details: Gets detailed information about a specific event
+- get_event_details: Gets the venue, dates and link for a specific event
+- get_event_description: Gets the full description of a specific event, only when the user asks what it is about
 - get_ticket_status: Checks ticket availability for an event
+- get_ticket_dashboard: Shows ticket sales for many events at once, optionally filtered by name or date range
 - search_events: Searches for events matching a query
 - get_upcoming_events: Shows upcoming events
 
 When users ask about events, tickets, or activities, use the appropriate tools to provide accurate information.
+For ticket sales across several events, call get_ticket_dashboard once rather than get_ticket_status per event.
 Be friendly and helpful, and always provide relevant information about WIT Unimelb events.
 
 If a user asks about something not related to events or WIT Unimelb, politely redirect them to ask about events or activities."""
@@ -58,11 +55,7 @@ async def test_llmgine():
     
     # Register tools
     print("🔧 Registering tools...")
-    await engine.register_tool(list_events)
-    await engine.register_tool(get_event_details)
-    await engine.register_tool(get_ticket_status)
-    await engine.register_tool(search_events)
-    await engine.register_tool(get_upcoming_events)
+    await engine.register_tools(HUMANITIX_TOOLS)
     
     print("✅ Tools registered successfully!")
     print("\n" + "="*50)
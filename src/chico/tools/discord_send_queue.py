@@ -0,0 +1,273 @@
+"""
+Outbound message queue for the Discord bot.
+Each channel gets its own queue and worker that splits long replies at
+Markdown boundaries, coalesces bursts, turns event listings into embeds and
+paces sends to stay under Discord's per-channel rate limit.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import discord
+
+# Discord allows 2000 characters per message and 4096 per embed description
+MESSAGE_LIMIT = 1900
+EMBED_LIMIT = 4000
+
+# Listings with at least this many items are sent as an embed
+EMBED_MIN_ITEMS = 4
+
+FENCE_RE = re.compile(r"^\s*```")
+BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+\.)\s+")
+
+
+def split_markdown(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Split text into chunks of at most limit characters at Markdown boundaries.
+
+    Prefers paragraph breaks, then line breaks. Only a line too long for a
+    chunk of its own is cut, where the chunk ends: at a space outside code
+    blocks, and exactly at the limit inside them so code keeps its whitespace.
+    A code block cut across chunks is closed and reopened so every chunk
+    renders on its own.
+    """
+    if len(text) <= limit:
+        return [text]
+
+    # Leave room to close a code fence at the end of a chunk
+    budget = limit - 4
+    chunks: List[str] = []
+    # (line, code fence still open after this line)
+    current: List[Tuple[str, Optional[str]]] = []
+    fence: Optional[str] = None
+    # True while current holds nothing but a reopened code fence
+    fresh = False
+
+    def size(items):
+        return sum(len(line) + 1 for line, _ in items)
+
+    for line in text.split("\n"):
+        while True:
+            room = budget - size(current) - 1
+            if len(line) <= room:
+                break
+            # Lines that fit in a chunk of their own move to the next chunk whole;
+            # longer ones fill this chunk first unless it is all but full
+            fresh_room = budget - (len(fence) + 1 if fence else 0) - 1
+            if current and not fresh and (len(line) <= fresh_room or room < 40):
+                split_at = len(current)
+                # Prefer the last paragraph break outside a code block in the back half
+                for j in range(len(current) - 1, len(current) // 2, -1):
+                    if current[j][0].strip() == "" and current[j - 1][1] is None:
+                        split_at = j
+                        break
+                head, rest = current[:split_at], current[split_at:]
+                open_fence = head[-1][1]
+                body = "\n".join(l for l, _ in head).strip("\n")
+                if open_fence:
+                    body += "\n```"
+                if body:
+                    chunks.append(body)
+                reopened = [(open_fence, open_fence)] if open_fence else []
+                current = reopened + rest
+                fresh = not rest
+                continue
+
+            # Cut the line where the chunk ends: at a space outside code blocks,
+            # exactly at the boundary inside them so whitespace is kept
+            cut = max(room, 1)
+            if fence is None:
+                space = line.rfind(" ", cut // 2, cut + 1)
+                if space > 0:
+                    cut = space
+            current.append((line[:cut], fence))
+            fresh = False
+            line = line[cut + 1:] if fence is None and line[cut:cut + 1] == " " else line[cut:]
+
+        if FENCE_RE.match(line):
+            fence = None if fence else line.strip()
+        current.append((line, fence))
+        fresh = False
+
+    body = "\n".join(l for l, _ in current).strip("\n")
+    if fence:
+        body += "\n```"
+    if body:
+        chunks.append(body)
+    return chunks
+
+
+def listing_embed(text: str) -> Optional[discord.Embed]:
+    """Build an embed for a heading followed by a list or table, else None."""
+    lines = text.strip().split("\n")
+    if len(lines) < 2 or len(text) > EMBED_LIMIT or len(lines[0]) > 256:
+        return None
+    heading = lines[0].strip()
+    if BULLET_RE.match(heading):
+        return None
+    body = lines[1:]
+    items = sum(1 for line in body if BULLET_RE.match(line))
+    is_table = body[0].strip().startswith("```") and len(body) - 2 >= EMBED_MIN_ITEMS
+    if items < EMBED_MIN_ITEMS and not is_table:
+        return None
+    return discord.Embed(
+        title=heading.strip("*").rstrip(":").strip(),
+        description="\n".join(body).strip(),
+        colour=discord.Colour.purple(),
+    )
+
+
+@dataclass
+class SendStats:
+    """Counters for outbound Discord traffic."""
+    messages: int = 0
+    embeds: int = 0
+    coalesced: int = 0
+    rate_limited: int = 0
+    latency_seconds: float = 0.0
+    max_latency_seconds: float = 0.0
+    sends: int = 0
+
+    def summary(self) -> str:
+        """Format the counters for logs or a Discord reply."""
+        avg = self.latency_seconds / self.sends if self.sends else 0.0
+        return (
+            f"sends={self.sends} messages={self.messages} embeds={self.embeds} "
+            f"coalesced={self.coalesced} 429s={self.rate_limited} "
+            f"avg_latency={avg:.2f}s max_latency={self.max_latency_seconds:.2f}s"
+        )
+
+
+class _RateLimitCounter(logging.Handler):
+    """Counts the 429 responses discord.py retries internally."""
+
+    def __init__(self, stats: SendStats):
+        super().__init__(level=logging.WARNING)
+        self.stats = stats
+
+    def emit(self, record: logging.LogRecord):
+        if "429" in record.getMessage():
+            self.stats.rate_limited += 1
+
+
+@dataclass
+class _Outgoing:
+    content: str
+    reference: Optional[Any]
+    queued_at: float
+    future: asyncio.Future
+
+
+@dataclass
+class _Channel:
+    queue: "asyncio.Queue[_Outgoing]" = field(default_factory=asyncio.Queue)
+    sent_at: Deque[float] = field(default_factory=deque)
+
+
+class DiscordSendQueue:
+    def __init__(self, rate: int = 5, per: float = 5.0, idle_timeout: float = 60.0):
+        """Initialize the queue.
+
+        Args:
+            rate: Messages allowed per channel in each window
+            per: Length of the rate limit window, in seconds
+            idle_timeout: Seconds before an idle channel worker exits
+        """
+        self.rate = rate
+        self.per = per
+        self.idle_timeout = idle_timeout
+        self.stats = SendStats()
+        self._channels: Dict[int, _Channel] = {}
+        logging.getLogger("discord.http").addHandler(_RateLimitCounter(self.stats))
+
+    async def send(self, channel: Any, content: str, reference: Optional[Any] = None):
+        """Queue content for a channel and wait until it has been sent.
+
+        Args:
+            channel: The channel to send to
+            content: The text to send, of any length
+            reference: Optional message to reply to with the first chunk
+        """
+        state = self._channels.get(channel.id)
+        if state is None:
+            state = self._channels[channel.id] = _Channel()
+            asyncio.create_task(self._worker(channel, state))
+        future = asyncio.get_running_loop().create_future()
+        state.queue.put_nowait(_Outgoing(content, reference, time.perf_counter(), future))
+        await future
+
+    async def _worker(self, channel: Any, state: _Channel):
+        carry: Optional[_Outgoing] = None
+        while True:
+            if carry is not None:
+                item, carry = carry, None
+            else:
+                try:
+                    item = await asyncio.wait_for(state.queue.get(), timeout=self.idle_timeout)
+                except asyncio.TimeoutError:
+                    if state.queue.empty():
+                        del self._channels[channel.id]
+                        return
+                    continue
+
+            # Coalesce plain messages that queued up behind this one
+            batch = [item]
+            while not state.queue.empty():
+                nxt = state.queue.get_nowait()
+                if nxt.reference is not None or len(item.content) + len(nxt.content) + 2 > MESSAGE_LIMIT:
+                    carry = nxt
+                    break
+                batch.append(nxt)
+                item = _Outgoing(
+                    f"{item.content}\n\n{nxt.content}", item.reference, item.queued_at, item.future
+                )
+            self.stats.coalesced += len(batch) - 1
+
+            try:
+                await self._deliver(channel, state, item.content, item.reference)
+                error = None
+            except Exception as e:
+                if isinstance(e, discord.HTTPException) and e.status == 429:
+                    self.stats.rate_limited += 1
+                error = e
+
+            latency = time.perf_counter() - batch[0].queued_at
+            self.stats.sends += len(batch)
+            self.stats.latency_seconds += latency * len(batch)
+            self.stats.max_latency_seconds = max(self.stats.max_latency_seconds, latency)
+            for queued in batch:
+                if queued.future.done():
+                    continue
+                if error is None:
+                    queued.future.set_result(None)
+                else:
+                    queued.future.set_exception(error)
+
+    async def _deliver(self, channel: Any, state: _Channel, content: str, reference: Optional[Any]):
+        if not content.strip():
+            # Discord rejects empty messages
+            return
+        embed = listing_embed(content)
+        if embed is not None:
+            await self._wait_for_slot(state)
+            await channel.send(embed=embed, reference=reference)
+            self.stats.embeds += 1
+            return
+        for i, chunk in enumerate(split_markdown(content)):
+            await self._wait_for_slot(state)
+            await channel.send(chunk, reference=reference if i == 0 else None)
+            self.stats.messages += 1
+
+    async def _wait_for_slot(self, state: _Channel):
+        """Wait until sending stays within rate messages per window."""
+        now = time.monotonic()
+        while state.sent_at and now - state.sent_at[0] >= self.per:
+            state.sent_at.popleft()
+        if len(state.sent_at) >= self.rate:
+            await asyncio.sleep(state.sent_at[0] + self.per - now)
+            state.sent_at.popleft()
+        state.sent_at.append(time.monotonic())
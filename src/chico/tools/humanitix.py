@@ -1,17 +1,42 @@
 import requests
 import re
 import difflib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import json
 import os
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+EVENTS_CACHE_KEY = "humanitix:events"
+
+# Seconds to wait for a Humanitix API response
+REQUEST_TIMEOUT = float(os.getenv("HUMANITIX_TIMEOUT", "10"))
+
+# Tickets fetched per page when counting sales, and the most pages read
+TICKETS_PAGE_SIZE = 100
+MAX_TICKET_PAGES = 50
+
 class Humanitix:
-    def __init__(self, api_key=None):
-        """Initialize Humanitix client with API key."""
+    def __init__(self, api_key=None, cache=None, cache_ttl=None):
+        """Initialize Humanitix client with API key.
+
+        The event catalogue is kept in memory for cache_ttl seconds. If a shared
+        cache (see chico.tools.shared_state) is given, it is consulted before
+        the API on an in-memory miss.
+        """
         self.api_key = api_key or os.getenv("HUMANITIX_API_KEY")
+        self.cache = cache
+        self.cache_ttl = cache_ttl or float(os.getenv("HUMANITIX_CACHE_TTL", "300"))
+        self.ticket_counts_ttl = float(os.getenv("HUMANITIX_TICKET_TTL", "60"))
+        self.snapshot_path = None
+        self._ticket_counts = {}
+        # (data, fetched_at, name_index), always replaced as one tuple so
+        # readers never pair a catalogue with another refresh's index
+        self._catalogue = None
     
     def validate_api_key(self):
         """Check if API key is available."""
@@ -20,47 +45,133 @@ class Humanitix:
         return True
     
     def get_all_events(self):
+        """Get all events, from the in-memory or shared cache when fresh."""
+        return self._get_catalogue()[0]
+    
+    def refresh_events(self):
+        """Fetch all events from the API and update the caches and snapshot."""
+        return self._refresh_catalogue()[0]
+    
+    def _get_catalogue(self):
+        """Get the catalogue as a (data, fetched_at, name_index) tuple."""
+        catalogue = self._catalogue
+        if catalogue is not None and time.time() - catalogue[1] < self.cache_ttl:
+            return catalogue
+        if self.cache is not None:
+            cached = self.cache.get(EVENTS_CACHE_KEY, max_age=self.cache_ttl)
+            if cached is not None:
+                return self._set_events(cached)
+        return self._refresh_catalogue()
+    
+    def _refresh_catalogue(self):
+        data = self.fetch_all_events()
+        catalogue = self._set_events(data)
+        if self.cache is not None:
+            self.cache.set(EVENTS_CACHE_KEY, data)
+        if self.snapshot_path:
+            try:
+                self.save_snapshot(self.snapshot_path)
+            except OSError as e:
+                print(f"Error saving event snapshot: {e}")
+        return catalogue
+    
+    def _set_events(self, data, fetched_at=None, name_index=None):
+        """Swap in a catalogue and its lower-cased name index, and return them."""
+        if name_index is None:
+            name_index = {
+                e.get("name", "").lower(): i for i, e in enumerate(data.get("events", []))
+            }
+        self._catalogue = (data, fetched_at or time.time(), name_index)
+        return self._catalogue
+    
+    def save_snapshot(self, path):
+        """Write the current catalogue and name index to disk for warm starts."""
+        catalogue = self._catalogue
+        if catalogue is None:
+            return
+        data, fetched_at, name_index = catalogue
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "saved_at": fetched_at,
+                    "events": data,
+                    "name_index": name_index,
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+    
+    def load_snapshot(self, path):
+        """Restore the catalogue from a snapshot. Returns True if one was loaded.
+
+        The restored catalogue is served as fresh for one cache_ttl so the first
+        requests after a restart don't wait on the API; callers are expected to
+        refresh it in the background.
+        """
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self._set_events(snapshot["events"], name_index=snapshot.get("name_index"))
+        return True
+    
+    def fetch_all_events(self):
         """Fetch all events from Humanitix API using your API key."""
         url = "https://api.humanitix.com/v1/events?page=1"
         headers = {
             "x-api-key": self.api_key,
             "Content-Type": "application/json"
         }
-        response = requests.get(url, headers=headers)
+        response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
     
     def get_event_attendees(self, event_id):
-        """Fetch attendees for a specific event using the orders endpoint."""
+        """Count the tickets sold for an event using the tickets endpoint.
         
-        # Use the orders endpoint which we know works
-        url = f"https://api.humanitix.com/v1/events/{event_id}/orders"
+        Every page is read and cancelled tickets are skipped, so orders with
+        several tickets and events with more than one page are counted in
+        full. Returns None if the count can't be fetched completely.
+        """
+        url = f"https://api.humanitix.com/v1/events/{event_id}/tickets"
         
         headers = {
             "x-api-key": self.api_key,
             "Content-Type": "application/json"
         }
         
+        sold = 0
         try:
-            # Get page 1 to count orders
-            params = {"page": 1}
-            response = requests.get(url, headers=headers, params=params)
-            
-            if response.status_code == 200:
-                data = response.json()
-                orders_count = len(data.get("orders", []))
-                return {"total_attendees": orders_count}
-                
-        except Exception as e:
-            pass
+            for page in range(1, MAX_TICKET_PAGES + 1):
+                params = {"page": page, "pageSize": TICKETS_PAGE_SIZE}
+                response = requests.get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
+                if response.status_code != 200:
+                    return None
+                tickets = response.json().get("tickets", [])
+                sold += sum(1 for t in tickets if t.get("status") != "cancelled")
+                if len(tickets) < TICKETS_PAGE_SIZE:
+                    return {"total_attendees": sold}
+        except Exception:
+            return None
         
+        # A partial count would understate sales, so report it as unavailable
         return None
     
     def find_event_by_name(self, user_input):
         """Find an event by name using fuzzy matching."""
         try:
-            data = self.get_all_events()
+            data, _, name_index = self._get_catalogue()
             events = data.get("events", [])
+            # Exact (case-insensitive) names skip fuzzy matching entirely
+            index = name_index.get(user_input.strip().lower())
+            if index is not None and index < len(events):
+                event = events[index]
+                return event.get("name", ""), event
             event_names = [e.get("name", "") for e in events]
             matches = difflib.get_close_matches(user_input, event_names, n=1, cutoff=0.5)
             if not matches:
@@ -71,13 +182,20 @@ class Humanitix:
         except Exception:
             return None, None
     
-    def get_event_details(self, event):
-        """Format a summary of a single event for Discord output."""
-        name = event.get("name", "Unnamed Event")
-        eid = event.get("_id", "No ID")
+    def get_event_description(self, event):
+        """Get an event's description with HTML tags removed."""
         desc = event.get("description", "No description provided.")
         # Remove HTML tags from description
-        desc = re.sub(r'<[^>]+>', '', desc)
+        return re.sub(r'<[^>]+>', '', desc).strip()
+    
+    def get_event_details(self, event, include_description=True):
+        """Format a summary of a single event for Discord output.
+        
+        With include_description=False only the id, venue, dates and link are
+        included, which keeps the text short when it is fed back to the LLM.
+        """
+        name = event.get("name", "Unnamed Event")
+        eid = event.get("_id", "No ID")
         start = event.get("startDate", "?")
         end = event.get("endDate", "?")
         # Format date/time if possible
@@ -94,7 +212,8 @@ class Humanitix:
         msg += f"**Venue:** {venue}\n"
         msg += f"**Start:** {start_fmt}\n"
         msg += f"**End:** {end_fmt}\n"
-        msg += f"**Description:**\n{desc.strip()}\n"
+        if include_description:
+            msg += f"**Description:**\n{self.get_event_description(event)}\n"
         if url:
             msg += f"[Event Link]({url})"
         return msg
@@ -120,7 +239,7 @@ class Humanitix:
         except Exception as e:
             return f"Error fetching events: {e}"
     
-    def show_event_details_by_name(self, user_input):
+    def show_event_details_by_name(self, user_input, include_description=True):
         """Get event details by name."""
         if not self.validate_api_key():
             return "❌ HUMANITIX_API_KEY not set in .env file."
@@ -129,12 +248,12 @@ class Humanitix:
             best_match, event = self.find_event_by_name(user_input)
             if not event:
                 return f"No event found matching '{user_input}'."
-            return self.get_event_details(event)
+            return self.get_event_details(event, include_description=include_description)
         except Exception as e:
             return f"Error fetching event details: {e}"
     
-    def get_ticket_status(self, user_input):
-        """Get ticket status for an event by name."""
+    def show_event_description_by_name(self, user_input):
+        """Get just the description of an event by name."""
         if not self.validate_api_key():
             return "❌ HUMANITIX_API_KEY not set in .env file."
         
@@ -142,41 +261,202 @@ class Humanitix:
             best_match, event = self.find_event_by_name(user_input)
             if not event:
                 return f"No event found matching '{user_input}'."
-            
-            # Get basic event info
-            total_capacity = event.get("totalCapacity", None)
-            
-            # Try to get real-time attendee data
-            event_id = event.get("_id")
-            attendee_counts = self.get_event_attendees(event_id)
-            
-            if attendee_counts:
-                # We got real attendee data!
-                total_sold = attendee_counts.get("total_attendees", 0)
-                
-                if total_sold > total_capacity:
-                    return (f"**{best_match}**\n"
-                            f"Total capacity: {total_capacity}\n"
-                            f"Attendees: {total_sold}\n"
-                            f"Tickets remaining: {0}")
-                
-                tickets_remaining = total_capacity - total_sold if total_capacity else 0
-                
-                msg = f"**{best_match}**\n"
-                msg += f"Total capacity: {total_capacity}\n"
-                msg += f"Attendees: {total_sold}\n"
-                msg += f"Tickets remaining: {tickets_remaining}"
-            else:
-                # Fallback to basic remaining tickets
-                ticket_types = event.get("ticketTypes", [])
-                tickets_remaining = sum(t.get("quantity", 0) for t in ticket_types if not t.get("disabled", False) and not t.get("deleted", False))
-                
-                msg = f"**{best_match}**\n"
-                if total_capacity is not None:
-                    msg += f"Total capacity: {total_capacity}\n"
-                msg += f"Tickets remaining: {tickets_remaining}\n"
-                msg += f"*(Real-time attendee data unavailable)*"
-            
-            return msg
+            return f"**{best_match}**\n{self.get_event_description(event)}"
+        except Exception as e:
+            return f"Error fetching event description: {e}"
+    
+    def get_ticket_counts(self, event, max_age=None):
+        """Get capacity, sold and remaining tickets for an event.
+        
+        Counts are served from memory or the shared cache until their
+        valid_until time: ticket_counts_ttl after an on-demand fetch, or the
+        event's next scheduled poll when the ticket watcher stored them. Pass
+        max_age to also require counts younger than max_age seconds;
+        max_age=0 forces a fetch.
+        """
+        event_id = event.get("_id")
+        if max_age != 0:
+            entry = self._ticket_counts.get(event_id)
+            if not self._ticket_counts_fresh(entry, max_age) and self.cache is not None:
+                entry = self.cache.get(f"humanitix:tickets:{event_id}")
+                if self._ticket_counts_fresh(entry, max_age):
+                    self._ticket_counts[event_id] = entry
+            if self._ticket_counts_fresh(entry, max_age):
+                return entry["counts"]
+        
+        counts = self.fetch_ticket_counts(event)
+        self.store_ticket_counts(event_id, counts, time.time() + self.ticket_counts_ttl)
+        return counts
+    
+    def store_ticket_counts(self, event_id, counts, valid_until):
+        """Cache an event's ticket counts in memory and the shared cache.
+        
+        Args:
+            event_id: The Humanitix event id
+            counts: Counts as returned by fetch_ticket_counts
+            valid_until: Unix time after which the counts must be fetched again
+        """
+        entry = {"counts": counts, "fetched_at": time.time(), "valid_until": valid_until}
+        self._ticket_counts[event_id] = entry
+        if self.cache is not None:
+            self.cache.set(f"humanitix:tickets:{event_id}", entry)
+    
+    def _ticket_counts_fresh(self, entry, max_age=None):
+        if not isinstance(entry, dict) or "valid_until" not in entry:
+            return False
+        now = time.time()
+        if max_age is not None and now - entry["fetched_at"] >= max_age:
+            return False
+        return now < entry["valid_until"]
+    
+    def fetch_ticket_counts(self, event):
+        """Fetch capacity, sold and remaining tickets for an event.
+        
+        Uses real-time ticket counts when available (live=True) and falls back
+        to the ticket type quantities on the event otherwise.
+        """
+        total_capacity = event.get("totalCapacity", None)
+        
+        # Try to get real-time attendee data
+        attendee_counts = self.get_event_attendees(event.get("_id"))
+        
+        if attendee_counts:
+            total_sold = attendee_counts.get("total_attendees", 0)
+            # Without a capacity the remaining count is unknown, not zero
+            tickets_remaining = max(total_capacity - total_sold, 0) if total_capacity is not None else None
+            return {
+                "capacity": total_capacity,
+                "sold": total_sold,
+                "remaining": tickets_remaining,
+                "live": True,
+            }
+        
+        # Fallback to basic remaining tickets
+        ticket_types = event.get("ticketTypes", [])
+        tickets_remaining = sum(t.get("quantity", 0) for t in ticket_types if not t.get("disabled", False) and not t.get("deleted", False))
+        return {
+            "capacity": total_capacity,
+            "sold": None,
+            "remaining": tickets_remaining,
+            "live": False,
+        }
+    
+    def get_ticket_status(self, user_input):
+        """Get ticket status for an event by name."""
+        if not self.validate_api_key():
+            return "❌ HUMANITIX_API_KEY not set in .env file."
+        
+        try:
+            return self.ticket_status(user_input)
+        except LookupError as e:
+            return str(e)
         except Exception as e:
             return f"Error fetching ticket status: {e}"
+    
+    def ticket_status(self, user_input):
+        """Get ticket status for an event by name, raising instead of returning errors.
+        
+        Raises:
+            LookupError: If no event matches user_input
+        """
+        best_match, event = self.find_event_by_name(user_input)
+        if not event:
+            raise LookupError(f"No event found matching '{user_input}'.")
+        
+        counts = self.get_ticket_counts(event)
+        
+        msg = f"**{best_match}**\n"
+        if counts["live"]:
+            if counts["capacity"] is not None:
+                msg += f"Total capacity: {counts['capacity']}\n"
+            msg += f"Attendees: {counts['sold']}\n"
+            remaining = "unknown" if counts["remaining"] is None else counts["remaining"]
+            msg += f"Tickets remaining: {remaining}"
+        else:
+            if counts["capacity"] is not None:
+                msg += f"Total capacity: {counts['capacity']}\n"
+            msg += f"Tickets remaining: {counts['remaining']}\n"
+            msg += f"*(Real-time attendee data unavailable)*"
+        
+        return msg
+    
+    def get_ticket_dashboard(self, name_filter=None, start_date=None, end_date=None, max_workers=5, max_events=20):
+        """Get ticket sales for every matching event as one compact table."""
+        if not self.validate_api_key():
+            return "❌ HUMANITIX_API_KEY not set in .env file."
+        
+        try:
+            return self.ticket_dashboard(name_filter, start_date, end_date, max_workers, max_events)
+        except (LookupError, ValueError) as e:
+            return str(e)
+        except Exception as e:
+            return f"Error fetching ticket dashboard: {e}"
+    
+    def ticket_dashboard(self, name_filter=None, start_date=None, end_date=None, max_workers=5, max_events=20):
+        """Get ticket sales for every matching event, raising instead of returning errors.
+        
+        Events are filtered by a case-insensitive name substring and an
+        inclusive YYYY-MM-DD start date range, which defaults to events from
+        today on. The first max_events by date are kept and their ticket counts
+        are fetched concurrently with at most max_workers requests in flight;
+        the table says how many more matched.
+        
+        Raises:
+            ValueError: If a date isn't in YYYY-MM-DD format
+            LookupError: If no events match the filter
+        """
+        try:
+            start = datetime.fromisoformat(start_date).date() if start_date else None
+            end = datetime.fromisoformat(end_date).date() if end_date else None
+        except ValueError:
+            raise ValueError("Dates must be in YYYY-MM-DD format.")
+        if start is None and end is None:
+            # Past events' sales don't change, so only show upcoming ones by default
+            start = datetime.now().date()
+        
+        events = self.get_all_events().get("events", [])
+        selected = []
+        for e in events:
+            if name_filter and name_filter.lower() not in e.get("name", "").lower():
+                continue
+            try:
+                event_date = datetime.fromisoformat((e.get("startDate") or "").replace('Z', '+00:00')).date()
+            except ValueError:
+                event_date = None
+            if event_date is None:
+                continue
+            if start and event_date < start:
+                continue
+            if end and event_date > end:
+                continue
+            selected.append((e, event_date))
+        if not selected:
+            raise LookupError("No events found for that filter.")
+        selected.sort(key=lambda item: item[1])
+        omitted = max(len(selected) - max_events, 0)
+        selected = selected[:max_events]
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            all_counts = list(pool.map(self.get_ticket_counts, [e for e, _ in selected]))
+        
+        rows = []
+        for (e, event_date), counts in zip(selected, all_counts):
+            capacity = counts["capacity"]
+            sold = counts["sold"] if counts["live"] else (capacity - counts["remaining"] if capacity else None)
+            rate = f"{sold / capacity:.0%}" if sold is not None and capacity else "?"
+            rows.append([
+                e.get("name", "Unnamed Event")[:32],
+                event_date.isoformat(),
+                "?" if capacity is None else str(capacity),
+                "?" if sold is None else str(sold),
+                "?" if counts["remaining"] is None else str(counts["remaining"]),
+                rate,
+            ])
+        
+        header = ["Event", "Date", "Capacity", "Sold", "Remaining", "Sell-through"]
+        widths = [max(len(row[i]) for row in rows + [header]) for i in range(len(header))]
+        lines = ["  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip() for row in [header] + rows]
+        msg = f"**Ticket sales for {len(rows)} events:**\n```\n" + "\n".join(lines) + "\n```"
+        if omitted:
+            msg += f"\n...and {omitted} more events; narrow the name or dates to see them."
+        return msg
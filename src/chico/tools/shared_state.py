@@ -0,0 +1,97 @@
+"""
+Shared state store for running several bot processes side by side.
+Backed by a single SQLite file in WAL mode so every process on the host can
+read the Humanitix catalogue cache and elect one process to refresh it.
+Conversation histories are shared through chico.llmgine.history_store.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Optional
+
+
+class SharedStateStore:
+    def __init__(self, path: str, owner_id: Optional[str] = None):
+        """Open (or create) the shared state database.
+
+        Args:
+            path: Path to the SQLite file shared by all bot processes
+            owner_id: Identifier of this process for leader election
+        """
+        self.path = path
+        self.owner_id = owner_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(
+            path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            """
+        )
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """Return a cached value, or None if missing or older than max_age seconds."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, updated_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, updated_at = row
+        if max_age is not None and time.time() - updated_at > max_age:
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serialisable value under key."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+
+    def try_acquire_lease(self, name: str, ttl: float) -> bool:
+        """Take or renew a named lease. Returns True if this process holds it.
+
+        The lease moves to another process only once the holder stops renewing
+        it and it expires, so exactly one process acts as leader at a time.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET "
+                "holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE leases.holder = excluded.holder OR leases.expires_at < ?",
+                (name, self.owner_id, now + ttl, now),
+            )
+            row = self._conn.execute(
+                "SELECT holder FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+        return row is not None and row[0] == self.owner_id
+
+    def close(self):
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
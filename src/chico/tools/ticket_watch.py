@@ -0,0 +1,169 @@
+"""
+Background ticket watcher.
+Polls ticket counts for upcoming events so ticket status answers are served
+from a warm cache, and announces events as they pass sell-through thresholds.
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+ALERTS_STATE_KEY = "ticket_watch:alerts"
+
+
+class TicketWatcher:
+    def __init__(
+        self,
+        client: Any,
+        announce: Optional[Callable[[str], Awaitable[None]]] = None,
+        thresholds: Optional[List[float]] = None,
+        state: Optional[Any] = None,
+        alerts_path: Optional[str] = None,
+        horizon_days: float = 30,
+        min_interval: float = 60,
+        max_interval: float = 3600,
+        max_concurrency: int = 3,
+    ):
+        """Initialize the watcher.
+
+        Args:
+            client: The Humanitix client whose ticket count cache is kept warm
+            announce: Optional coroutine called with each alert message
+            thresholds: Sell-through fractions that trigger an alert
+            state: Optional SharedStateStore holding the alerts already sent
+            alerts_path: JSON file holding the alerts already sent when there is
+                no shared store, so they aren't repeated after a restart
+            horizon_days: Only events starting within this many days are polled
+            min_interval: Shortest time between polls of one event, in seconds
+            max_interval: Longest time between polls of one event, in seconds
+            max_concurrency: Maximum ticket count fetches in flight at once
+        """
+        self.client = client
+        self.announce = announce
+        self.thresholds = sorted(thresholds or [0.8, 0.95, 1.0])
+        self.state = state
+        self.alerts_path = alerts_path
+        self.horizon_days = horizon_days
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.tick = 30.0
+        self._next_poll: Dict[str, float] = {}
+        # Loaded off the event loop when run() starts
+        self._alerted: Dict[str, float] = {}
+
+    def poll_interval(self, hours_until_start: float, sell_through: float) -> float:
+        """Seconds until an event should be polled again.
+
+        Roughly one minute per hour left before the event, shortened further
+        as sell-through climbs, and clamped to [min_interval, max_interval].
+        """
+        interval = min(max(hours_until_start * 60, self.min_interval), self.max_interval)
+        interval *= max(0.25, 1 - sell_through)
+        return max(interval, self.min_interval)
+
+    async def run(self, tick: float = 30, should_poll: Optional[Callable[[], bool]] = None):
+        """Poll forever, checking every tick seconds which events are due.
+
+        Args:
+            tick: Seconds between checks for due events
+            should_poll: Optional check run each tick in a worker thread, e.g. a
+                leader lease
+        """
+        self.tick = tick
+        self._alerted = await asyncio.to_thread(self._load_alerts)
+        while True:
+            try:
+                if should_poll is None or await asyncio.to_thread(should_poll):
+                    await self.poll_due_events()
+            except Exception as e:
+                print(f"Error polling ticket status: {e}")
+            await asyncio.sleep(tick)
+
+    async def poll_due_events(self):
+        """Refresh ticket counts for every upcoming event whose poll is due."""
+        if not self.client.validate_api_key():
+            return
+        data = await asyncio.to_thread(self.client.get_all_events)
+        now = datetime.now(timezone.utc)
+        due = []
+        for event in data.get("events", []):
+            try:
+                start = datetime.fromisoformat((event.get("startDate") or "").replace('Z', '+00:00'))
+            except ValueError:
+                continue
+            hours_left = (start - now).total_seconds() / 3600
+            if hours_left <= 0 or hours_left > self.horizon_days * 24:
+                continue
+            if self._next_poll.get(event.get("_id"), 0) <= time.time():
+                due.append((event, hours_left))
+        await asyncio.gather(*(self._poll_event(event, hours) for event, hours in due))
+
+    async def _poll_event(self, event: dict, hours_left: float):
+        async with self._semaphore:
+            counts = await asyncio.to_thread(self.client.fetch_ticket_counts, event)
+
+        capacity = counts.get("capacity")
+        sold = counts.get("sold")
+        sell_through = sold / capacity if counts.get("live") and capacity else 0.0
+        next_poll = time.time() + self.poll_interval(hours_left, sell_through)
+        self._next_poll[event.get("_id")] = next_poll
+        # Serve these counts until the next poll has had a tick to land
+        await asyncio.to_thread(
+            self.client.store_ticket_counts, event.get("_id"), counts, next_poll + self.tick
+        )
+        await self._check_thresholds(event, sell_through, counts)
+
+    async def _check_thresholds(self, event: dict, sell_through: float, counts: dict):
+        event_id = event.get("_id")
+        crossed = [t for t in self.thresholds if sell_through >= t]
+        if not crossed or crossed[-1] <= self._alerted.get(event_id, 0):
+            return
+        threshold = crossed[-1]
+        self._alerted[event_id] = threshold
+        try:
+            await asyncio.to_thread(self._save_alerts, dict(self._alerted))
+        except Exception as e:
+            print(f"Error saving ticket alerts: {e}")
+
+        if self.announce is None:
+            return
+        name = event.get("name", "Unnamed Event")
+        if threshold >= 1:
+            msg = f"🎟️ **{name}** is now sold out!"
+        else:
+            msg = (f"🎟️ **{name}** is {sell_through:.0%} sold, "
+                   f"only {counts.get('remaining')} tickets left!")
+        if event.get("url"):
+            msg += f"\n{event['url']}"
+        try:
+            await self.announce(msg)
+        except Exception as e:
+            print(f"Error announcing ticket alert: {e}")
+
+    def _load_alerts(self) -> Dict[str, float]:
+        """Read the highest threshold already announced for each event."""
+        if self.state is not None:
+            return self.state.get(ALERTS_STATE_KEY) or {}
+        if self.alerts_path:
+            try:
+                with open(self.alerts_path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _save_alerts(self, alerted: Dict[str, float]):
+        if self.state is not None:
+            self.state.set(ALERTS_STATE_KEY, alerted)
+        elif self.alerts_path:
+            directory = os.path.dirname(self.alerts_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.alerts_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(alerted, f)
+            os.replace(tmp_path, self.alerts_path)
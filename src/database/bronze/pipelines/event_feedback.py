@@ -0,0 +1,277 @@
+"""
+Event feedback sentiment pipeline.
+Streams survey exports into bronze.event_feedback, dedupes comments by content
+hash and scores each unique comment once into silver.feedback_sentiment.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DDL_PATH = Path(__file__).resolve().parents[1] / "src" / "DDL" / "event_feedback.sql"
+DEFAULT_DATA_DIR = os.getenv("FEEDBACK_DATA_DIR", "data")
+
+
+def content_hash(comment: str) -> str:
+    """Hash a comment after normalising case, punctuation and whitespace."""
+    normalised = " ".join(re.sub(r"[^\w\s]", " ", comment.lower()).split())
+    return hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+
+
+def label_for(score: float) -> str:
+    """Bucket a score in [-1, 1] into a sentiment label."""
+    if score > 0.25:
+        return "positive"
+    if score < -0.25:
+        return "negative"
+    return "neutral"
+
+
+def read_survey_export(
+    path: str,
+    event_column: str = "event_id",
+    comment_column: str = "comment",
+    id_column: str = "response_id",
+    submitted_column: str = "submitted_at",
+) -> Iterator[Dict[str, Optional[str]]]:
+    """Stream rows with a non-empty comment from a survey CSV export.
+
+    Rows are yielded one at a time so large exports never sit in memory.
+    """
+    source_file = os.path.basename(path)
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            comment = (row.get(comment_column) or "").strip()
+            if not comment:
+                continue
+            yield {
+                "response_id": row.get(id_column) or f"{source_file}:{i}",
+                "event_id": row.get(event_column) or "unknown",
+                "comment": comment,
+                "content_hash": content_hash(comment),
+                "source_file": source_file,
+                "submitted_at": row.get(submitted_column) or None,
+            }
+
+
+def connect(data_dir: str = DEFAULT_DATA_DIR) -> sqlite3.Connection:
+    """Open the bronze and silver databases and make sure the tables exist."""
+    os.makedirs(data_dir, exist_ok=True)
+    conn = sqlite3.connect(":memory:")
+    conn.execute("ATTACH DATABASE ? AS bronze", (os.path.join(data_dir, "bronze.db"),))
+    conn.execute("ATTACH DATABASE ? AS silver", (os.path.join(data_dir, "silver.db"),))
+    conn.executescript(DDL_PATH.read_text())
+    return conn
+
+
+def ingest(conn: sqlite3.Connection, rows: Iterable[Dict], chunk_size: int = 500) -> int:
+    """Insert rows into bronze.event_feedback in chunks. Returns rows seen."""
+    sql = (
+        "INSERT OR IGNORE INTO bronze.event_feedback "
+        "(response_id, event_id, comment, content_hash, source_file, submitted_at) "
+        "VALUES (:response_id, :event_id, :comment, :content_hash, :source_file, :submitted_at)"
+    )
+    seen = 0
+    chunk: List[Dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            conn.executemany(sql, chunk)
+            conn.commit()
+            seen += len(chunk)
+            chunk = []
+    if chunk:
+        conn.executemany(sql, chunk)
+        conn.commit()
+        seen += len(chunk)
+    return seen
+
+
+class LexiconScorer:
+    """Small word-list scorer that runs locally on CPU with no extra dependencies."""
+
+    name = "lexicon-v1"
+
+    POSITIVE = {
+        "amazing", "awesome", "enjoyed", "excellent", "fantastic", "fun", "great",
+        "helpful", "informative", "insightful", "inspiring", "interesting", "love",
+        "loved", "useful", "welcoming", "well", "wonderful", "good", "friendly",
+    }
+    NEGATIVE = {
+        "bad", "boring", "confusing", "crowded", "disappointing", "disorganised",
+        "disorganized", "hard", "late", "long", "loud", "poor", "rushed", "slow",
+        "unclear", "waste", "worst", "awful", "cold", "hated",
+    }
+    NEGATORS = {"not", "no", "never", "wasn't", "didn't", "isn't", "don't"}
+
+    def score_batch(self, comments: List[str]) -> List[float]:
+        return [self._score(c) for c in comments]
+
+    def _score(self, comment: str) -> float:
+        words = re.findall(r"[a-z']+", comment.lower())
+        total = 0
+        hits = 0
+        for i, word in enumerate(words):
+            polarity = (word in self.POSITIVE) - (word in self.NEGATIVE)
+            if not polarity:
+                continue
+            if i > 0 and words[i - 1] in self.NEGATORS:
+                polarity = -polarity
+            total += polarity
+            hits += 1
+        return total / hits if hits else 0.0
+
+
+class OpenAIScorer:
+    """Scores a whole batch of comments with a single chat completion call."""
+
+    def __init__(self, model: str = "gpt-4.1-mini", api_key: Optional[str] = None):
+        from openai import OpenAI
+
+        self.model = model
+        self.name = f"openai:{model}"
+        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+
+    def score_batch(self, comments: List[str]) -> List[float]:
+        numbered = "\n".join(f"{i}. {json.dumps(c)}" for i, c in enumerate(comments))
+        response = self.client.chat.completions.create(
+            model=self.model,
+            temperature=0,
+            response_format={"type": "json_object"},
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You score the sentiment of event feedback comments. "
+                        'Reply with JSON {"scores": [...]} holding one number per '
+                        "comment, in order, from -1 (very negative) to 1 (very positive)."
+                    ),
+                },
+                {"role": "user", "content": numbered},
+            ],
+        )
+        scores = json.loads(response.choices[0].message.content or "{}").get("scores", [])
+        if len(scores) != len(comments):
+            raise ValueError(f"expected {len(comments)} scores, got {len(scores)}")
+        return [max(-1.0, min(1.0, float(s))) for s in scores]
+
+
+def unscored_comments(conn: sqlite3.Connection) -> List[tuple]:
+    """Return (content_hash, comment) for every hash not yet in the score cache."""
+    return conn.execute(
+        "SELECT f.content_hash, MIN(f.comment) FROM bronze.event_feedback f "
+        "WHERE NOT EXISTS (SELECT 1 FROM silver.feedback_sentiment s "
+        "WHERE s.content_hash = f.content_hash) "
+        "GROUP BY f.content_hash"
+    ).fetchall()
+
+
+def score_pending(
+    conn: sqlite3.Connection, scorer, batch_size: int = 25, max_workers: int = 4
+) -> int:
+    """Score uncached comments in batches on a bounded worker pool.
+
+    At most ``max_workers`` batches are in flight at once; results are written
+    from this thread as each batch completes, so a failed batch only loses its
+    own comments and they are picked up again on the next run.
+    """
+    pending = unscored_comments(conn)
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    scored = 0
+
+    def write(batch, scores):
+        conn.executemany(
+            "INSERT OR REPLACE INTO silver.feedback_sentiment "
+            "(content_hash, score, label, scorer) VALUES (?, ?, ?, ?)",
+            [(h, s, label_for(s), scorer.name) for (h, _), s in zip(batch, scores)],
+        )
+        conn.commit()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = {}
+        batch_iter = iter(batches)
+        while True:
+            while len(in_flight) < max_workers:
+                batch = next(batch_iter, None)
+                if batch is None:
+                    break
+                future = pool.submit(scorer.score_batch, [c for _, c in batch])
+                in_flight[future] = batch
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                try:
+                    write(batch, future.result())
+                    scored += len(batch)
+                except Exception as e:
+                    print(f"Error scoring batch of {len(batch)} comments: {e}")
+    return scored
+
+
+def event_sentiment_summary(conn: sqlite3.Connection) -> List[Dict]:
+    """Aggregate scored feedback per event for the dashboard."""
+    rows = conn.execute(
+        "SELECT f.event_id, COUNT(*), COUNT(DISTINCT f.content_hash), AVG(s.score), "
+        "SUM(s.label = 'positive'), SUM(s.label = 'neutral'), SUM(s.label = 'negative') "
+        "FROM bronze.event_feedback f "
+        "JOIN silver.feedback_sentiment s ON s.content_hash = f.content_hash "
+        "GROUP BY f.event_id ORDER BY f.event_id"
+    ).fetchall()
+    keys = ["event_id", "responses", "unique_comments", "avg_score", "positive", "neutral", "negative"]
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def run_pipeline(
+    paths: Iterable[str],
+    data_dir: str = DEFAULT_DATA_DIR,
+    scorer=None,
+    batch_size: int = 25,
+    max_workers: int = 4,
+) -> Dict[str, int]:
+    """Ingest survey exports and score any comments not already cached."""
+    scorer = scorer or LexiconScorer()
+    conn = connect(data_dir)
+    try:
+        ingested = sum(ingest(conn, read_survey_export(p)) for p in paths)
+        scored = score_pending(conn, scorer, batch_size=batch_size, max_workers=max_workers)
+        return {"ingested": ingested, "scored": scored}
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score event feedback sentiment.")
+    parser.add_argument("exports", nargs="+", help="Survey export CSV files")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--scorer", choices=["lexicon", "openai"], default="lexicon")
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    scorer = OpenAIScorer() if args.scorer == "openai" else LexiconScorer()
+    stats = run_pipeline(
+        args.exports,
+        data_dir=args.data_dir,
+        scorer=scorer,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+    )
+    print(f"Ingested {stats['ingested']} responses, scored {stats['scored']} new comments")
+
+
+if __name__ == "__main__":
+    main()
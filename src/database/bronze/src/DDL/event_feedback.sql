@@ -0,0 +1,23 @@
+CREATE TABLE IF NOT EXISTS bronze.event_feedback (
+    -- one row per survey response, duplicates of the same comment share a content_hash
+    response_id VARCHAR(255) NOT NULL,
+    event_id VARCHAR(255) NOT NULL,
+    comment TEXT NOT NULL,
+    content_hash CHAR(64) NOT NULL,
+    source_file VARCHAR(255),
+    submitted_at DATETIME,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (event_id, response_id)
+);
+
+CREATE INDEX IF NOT EXISTS bronze.idx_event_feedback_hash
+    ON event_feedback (content_hash);
+
+CREATE TABLE IF NOT EXISTS silver.feedback_sentiment (
+    -- scores are cached per unique comment, so re-runs only score new hashes
+    content_hash CHAR(64) PRIMARY KEY,
+    score REAL NOT NULL,
+    label VARCHAR(16) NOT NULL,
+    scorer VARCHAR(64) NOT NULL,
+    scored_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);